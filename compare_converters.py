@@ -0,0 +1,299 @@
+"""
+Runs two converters on the same articy:draft JSON export and checks that they generate the same Ren'Py control flow.
+Besides the comparison it reports the run time, throughput and peak memory of each converter.
+
+Usage: python compare_converters.py [--json-file export.json] [--reference main.py] [--candidate main_rework.py]
+
+Both converters read the config.ini of the current directory. They run in their own temporary directory with a copy
+of it, so only json_file and export_path are changed for them.
+"""
+import argparse
+import configparser
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# Options that are always overwritten in the temporary config, so the outputs only contain the control flow
+CONFIG_OVERRIDES = {"verbosity": "quiet",
+                    "diagnostics_file": "",
+                    "playtest_instrumentation": "False",
+                    "languages": ""}
+
+
+def run_converter(script_path, config, work_path):
+    """
+    Runs a converter script with the given config in the work path and returns its statistics.
+    The peak memory is the maximum resident set size of the converter process, it is only available on
+    systems that support os.wait4.
+
+    (Seconds, PeakMemory, ReturnCode, ExportPath)
+    """
+    export_path = os.path.join(work_path, "export")
+    os.makedirs(export_path)
+    run_config = configparser.ConfigParser(interpolation=None)
+    run_config.read_dict(config)
+    # The converters concatenate export_path and file names, so the path needs its trailing separator
+    run_config['DEFAULT']['export_path'] = export_path + os.sep
+    for key, value in CONFIG_OVERRIDES.items():
+        run_config['DEFAULT'][key] = value
+    with open(os.path.join(work_path, "config.ini"), "w") as config_file:
+        run_config.write(config_file)
+
+    start_time = time.perf_counter()
+    process = subprocess.Popen([sys.executable, os.path.abspath(script_path)], cwd=work_path)
+    peak_memory = None
+    if hasattr(os, "wait4"):
+        _, status, resource_usage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+        # ru_maxrss is counted in bytes on macOS and in kilobytes everywhere else
+        if sys.platform == "darwin":
+            peak_memory = resource_usage.ru_maxrss
+        else:
+            peak_memory = resource_usage.ru_maxrss * 1024
+    else:
+        process.wait()
+    run_seconds = time.perf_counter() - start_time
+
+    return {"Seconds": run_seconds,
+            "PeakMemory": peak_memory,
+            "ReturnCode": process.returncode,
+            "ExportPath": export_path}
+
+
+def get_canonical_label(label_name):
+    """
+    Takes a label name and returns it without the naming scheme of the converter.
+    Node labels become their articy id, start and end labels keep their Dialogue name.
+    """
+    label_parts = label_name.rsplit("_", 1)
+    if len(label_parts) == 1:
+        return label_name
+    if label_parts[1] in ["start", "end"]:
+        return "{}:{}".format(label_parts[1], label_parts[0])
+    return label_parts[1]
+
+
+def parse_code_block(code_lines, position, indent):
+    """
+    Parses the lines of a Ren'Py code block with the given indentation, starting at the given position.
+    Returns the list of statements and the position of the first line after the block.
+    Every statement is a dictionary with its Code and the statements of its indented Block.
+    """
+    statement_list = []
+    while position < len(code_lines):
+        line_indent, code = code_lines[position]
+        if line_indent < indent:
+            break
+        position += 1
+        statement = {"Code": code, "Block": []}
+        if position < len(code_lines) and code_lines[position][0] > line_indent:
+            statement["Block"], position = parse_code_block(code_lines, position, code_lines[position][0])
+        statement_list.append(statement)
+    return statement_list, position
+
+
+def read_rpy_labels(export_path):
+    """
+    Reads all *.rpy files of the export path and returns a dictionary of their labels and statements
+    """
+    label_dict = {}
+    for root_path, _, file_names in os.walk(export_path):
+        for file_name in sorted(file_names):
+            if not file_name.endswith(".rpy"):
+                continue
+            with open(os.path.join(root_path, file_name), encoding="utf-8") as rpy_file:
+                code_lines = []
+                for line in rpy_file.read().splitlines():
+                    code = line.strip()
+                    # Comments carry no control flow, and the playtest counter is switched off anyway
+                    if code and not code.startswith("#") and not code.startswith("$ articy_playtest_hit("):
+                        code_lines.append((len(line) - len(line.lstrip()), code))
+            statement_list, _ = parse_code_block(code_lines, 0, 0)
+            for statement in statement_list:
+                if statement["Code"].startswith("label ") and statement["Code"].endswith(":"):
+                    label_dict[statement["Code"][6:-1].strip()] = statement["Block"]
+    return label_dict
+
+
+def get_jump_target(statement_list):
+    """
+    Returns the label the given statements jump to or None if they don't jump
+    """
+    for statement in statement_list:
+        if statement["Code"].startswith("jump "):
+            return statement["Code"][5:].strip()
+    return None
+
+
+def trace_label(label_name, label_dict):
+    """
+    Follows the statements of a label through all unconditional jumps up to the next branch
+    and returns them as normalized list of steps, together with the labels the branches continue at.
+
+    Menus and if-statements end a trace, their jump targets start new traces. Menu captions become
+    spoken lines in front of the menu, so it doesn't matter whether a converter writes them inside the menu.
+    """
+    trace = []
+    branch_labels = []
+    visited_labels = []
+    while True:
+        if label_name.endswith("_end") or label_name not in label_dict:
+            trace.append(("jump", get_canonical_label(label_name)))
+            return trace, branch_labels
+        if label_name in visited_labels:
+            trace.append(("loop", get_canonical_label(label_name)))
+            return trace, branch_labels
+        visited_labels.append(label_name)
+
+        next_label = None
+        for statement in label_dict[label_name]:
+            code = statement["Code"]
+            if code.startswith("jump "):
+                next_label = code[5:].strip()
+                break
+            elif code == "return":
+                trace.append(("return",))
+                return trace, branch_labels
+            elif code == "pass":
+                continue
+            elif code == "menu:":
+                choice_list = []
+                for menu_statement in statement["Block"]:
+                    if not menu_statement["Code"].endswith(":"):
+                        trace.append(("say", menu_statement["Code"]))
+                        continue
+                    choice_target = get_jump_target(menu_statement["Block"])
+                    choice_code = [choice_statement["Code"] for choice_statement in menu_statement["Block"]
+                                   if not choice_statement["Code"].startswith("jump ")]
+                    choice_list.append((menu_statement["Code"], tuple(choice_code),
+                                        get_canonical_label(str(choice_target))))
+                    branch_labels.append(choice_target)
+                trace.append(("menu", tuple(sorted(choice_list))))
+                return trace, branch_labels
+            elif code.startswith("if ") or code.startswith("elif ") or code == "else:":
+                condition_target = get_jump_target(statement["Block"])
+                trace.append(("branch", " ".join(code.split()), get_canonical_label(str(condition_target))))
+                branch_labels.append(condition_target)
+                if code == "else:":
+                    return trace, branch_labels
+            elif code.startswith("$ "):
+                trace.append(("python", " ".join(code[2:].split())))
+            elif code.startswith("\"") or " \"" in code:
+                trace.append(("say", code))
+            else:
+                trace.append(("code", code))
+        if next_label is None:
+            trace.append(("fallthrough",))
+            return trace, branch_labels
+        label_name = next_label
+
+
+def build_label_graph(label_dict):
+    """
+    Traces every label that is reachable from a start label and returns the traces by their canonical label
+    """
+    label_graph = {}
+    open_labels = [label_name for label_name in label_dict if label_name.endswith("_start")]
+    while open_labels:
+        label_name = open_labels.pop()
+        if label_name is None or get_canonical_label(label_name) in label_graph:
+            continue
+        trace, branch_labels = trace_label(label_name, label_dict)
+        label_graph[get_canonical_label(label_name)] = trace
+        open_labels.extend(branch_labels)
+    return label_graph
+
+
+def compare_label_graphs(reference_graph, candidate_graph):
+    """
+    Compares two label graphs and returns a list of readable differences
+    """
+    difference_list = []
+    for label in sorted(set(reference_graph) | set(candidate_graph)):
+        if label not in candidate_graph:
+            difference_list.append("{}: only reachable in the reference".format(label))
+        elif label not in reference_graph:
+            difference_list.append("{}: only reachable in the candidate".format(label))
+        elif reference_graph[label] != candidate_graph[label]:
+            reference_trace = reference_graph[label]
+            candidate_trace = candidate_graph[label]
+            step = 0
+            while step < min(len(reference_trace), len(candidate_trace)) and \
+                    reference_trace[step] == candidate_trace[step]:
+                step += 1
+            reference_step = reference_trace[step] if step < len(reference_trace) else None
+            candidate_step = candidate_trace[step] if step < len(candidate_trace) else None
+            difference_list.append("{}: step {} differs\n    reference: {}\n    candidate: {}".format(
+                label, step, reference_step, candidate_step))
+    return difference_list
+
+
+def format_memory(peak_memory):
+    """
+    Returns the peak memory in MiB as text
+    """
+    if peak_memory is None:
+        return "n/a"
+    return "{:.1f} MiB".format(peak_memory / 1048576)
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(description="Compares the Ren'Py control flow and performance "
+                                                          "of two articy:draft converters.")
+    argument_parser.add_argument("--json-file", help="articy:draft JSON export, defaults to json_file of the config")
+    argument_parser.add_argument("--config", default="config.ini", help="Config file both converters start from")
+    argument_parser.add_argument("--reference", default="main.py", help="Converter script used as reference")
+    argument_parser.add_argument("--candidate", default="main_rework.py", help="Converter script that is checked")
+    argument_parser.add_argument("--runs", type=int, default=1, help="Runs per converter, the fastest one counts")
+    arguments = argument_parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    config = configparser.ConfigParser(interpolation=None)
+    config.read(arguments.config)
+    json_file = arguments.json_file or config['DEFAULT']['json_file']
+    config['DEFAULT']['json_file'] = os.path.abspath(json_file)
+    # main.py and main_rework.py name the entity option differently, so both get it
+    entity_types = config['DEFAULT'].get('entity_features', config['DEFAULT'].get('entity_types', ''))
+    config['DEFAULT']['entity_features'] = entity_types
+    config['DEFAULT']['entity_types'] = entity_types
+
+    with open(json_file, "rb") as file:
+        node_count = len(json.loads(file.read())["Packages"][0]["Models"])
+
+    result_dict = {}
+    for script_path in [arguments.reference, arguments.candidate]:
+        run_list = []
+        label_graph = {}
+        for run_number in range(arguments.runs):
+            logging.info("Run %s (%s/%s)", script_path, run_number + 1, arguments.runs)
+            with tempfile.TemporaryDirectory(prefix="articy2renpy_") as work_path:
+                run_list.append(run_converter(script_path, config, work_path))
+                if run_number == arguments.runs - 1:
+                    label_graph = build_label_graph(read_rpy_labels(run_list[-1]["ExportPath"]))
+        peak_memory_list = [run["PeakMemory"] for run in run_list if run["PeakMemory"] is not None]
+        result_dict[script_path] = {"Seconds": min(run["Seconds"] for run in run_list),
+                                    "PeakMemory": max(peak_memory_list) if peak_memory_list else None,
+                                    "ReturnCode": max(run["ReturnCode"] for run in run_list),
+                                    "LabelGraph": label_graph}
+
+    print("Performance ({} models in the export)".format(node_count))
+    for script_path, result in result_dict.items():
+        print("  {:<20} {:8.3f} s {:10.0f} models/s  peak {}  exit code {}".format(
+            script_path, result["Seconds"], node_count / max(result["Seconds"], 1e-9),
+            format_memory(result["PeakMemory"]), result["ReturnCode"]))
+
+    reference_graph = result_dict[arguments.reference]["LabelGraph"]
+    candidate_graph = result_dict[arguments.candidate]["LabelGraph"]
+    difference_list = compare_label_graphs(reference_graph, candidate_graph)
+    print("Control flow: {} reference and {} candidate labels reachable, {} differences".format(
+        len(reference_graph), len(candidate_graph), len(difference_list)))
+    for difference in difference_list:
+        print("  {}".format(difference))
+
+    if difference_list or any(result["ReturnCode"] for result in result_dict.values()):
+        sys.exit(1)
@@ -29,17 +29,32 @@
 # SOFTWARE.
 
 
+import argparse
 import configparser
+import csv
 import datetime
+import importlib
 import json
 import logging
 import os
 import re
+import shutil
+import sys
+import time
+import tracemalloc
+
+from renpy_text import convert_renpy_text, split_code_lines
 
 DIALOGUE_NODE_TYPES = ["DialogueFragment", "Hub", "Jump", "Condition", "Instruction"]
+# JSON decoder modules in the order the "auto" backend tries them, the stdlib json module is the fallback
+JSON_DECODER_BACKENDS = ["orjson", "ujson", "json"]
 
 # List that store all articy variables
 variable_list = []
+# List that stores all articy variable namespaces
+variable_namespace_list = []
+# Dictionary that stores which dialogues read and write which articy variables
+variable_usage_index = {}
 # List that stores all entities
 entity_list = []
 # List that stores all dialogues
@@ -47,10 +62,106 @@ dialogue_list = []
 # List that stores all dialogue nodes
 dialogue_node_list = []
 
-logging.basicConfig(level=logging.DEBUG)
+# Regex that finds articy variable references like "Namespace.Variable" in code
+VARIABLE_REFERENCE_REGEX = re.compile(r"\b([A-Za-z_]\w*)\.([A-Za-z_]\w*)\b")
+# Regex that finds the variable an articy instruction statement assigns to
+VARIABLE_ASSIGNMENT_REGEX = re.compile(r"^\s*([A-Za-z_]\w*\.[A-Za-z_]\w*)\s*(?:([-+*/%]?)=(?!=)|(\+\+|--))")
+
+# Ren'Py code of the playtest hit counter that is exported with playtest_instrumentation
+# Hits are cached in memory and only added to the hits file every {batch_size} hits and when the game quits.
+PLAYTEST_RUNTIME_CODE = """init -100 python:
+    import collections
+    import json
+    import os
+
+    articy_playtest_batch_size = {batch_size}
+    articy_playtest_counts = collections.Counter()
+
+    def articy_playtest_flush():
+        if not articy_playtest_counts:
+            return
+        file_path = os.path.join(config.savedir or config.basedir, "articy_playtest_hits.json")
+        hits = {{}}
+        if os.path.isfile(file_path):
+            with open(file_path) as hits_file:
+                hits = json.load(hits_file)
+        for key, count in articy_playtest_counts.items():
+            hits[key] = hits.get(key, 0) + count
+        with open(file_path, "w") as hits_file:
+            json.dump(hits, hits_file, indent=1, sort_keys=True)
+        articy_playtest_counts.clear()
+
+    def articy_playtest_hit(key):
+        articy_playtest_counts[key] += 1
+        if sum(articy_playtest_counts.values()) >= articy_playtest_batch_size:
+            articy_playtest_flush()
+
+    config.quit_callbacks.append(articy_playtest_flush)
+"""
+
+# Log levels of the verbosity setting, "verbose" also produces the per node diagnostics
+VERBOSITY_LEVELS = {"quiet": logging.WARNING, "normal": logging.INFO, "verbose": logging.DEBUG}
+
+# Per node diagnostics are only produced if the verbosity or the diagnostics file asks for them
+node_diagnostics_enabled = False
+# File that receives the per node diagnostics as one JSON record per line
+diagnostics_file = None
+
+
+def log_node_event(event, message, **fields):
+    """
+    Logs a per node diagnostic event and writes it as record to the diagnostics file.
+    Returns right away if node diagnostics are disabled, so a normal run does not pay for them.
+    The message is only formatted with the fields if it is actually logged.
+    """
+    if not node_diagnostics_enabled:
+        return
+    if diagnostics_file:
+        diagnostics_file.write("{}\n".format(json.dumps(dict(fields, Event=event))))
+    logging.debug(message, fields)
 
 
-def translate_code_condition(code_condition):
+def read_config_bool(config_section, key, default=False):
+    """
+    Reads a boolean option from a config section and returns it.
+    Missing or unreadable values fall back to the given default.
+    """
+    value = config_section.get(key, "")
+    if value.lower() in ['true', 'yes', 't', 'y', '1']:
+        return True
+    elif value.lower() in ['false', 'no', 'f', 'n', '0']:
+        return False
+    return default
+
+
+def record_variable_usage(code, dialogue_id, is_instruction):
+    """
+    Adds the articy variables referenced in the given code to the variable_usage_index.
+    Conditions only read variables, instructions write the variable left of an assignment
+    and read everything else (compound assignments like "+=" also read their target).
+    """
+    if not dialogue_id:
+        return
+    for statement in code.replace("\r", "").replace("\n", ";").split(";"):
+        written_variable = None
+        if is_instruction:
+            assignment_match = VARIABLE_ASSIGNMENT_REGEX.match(statement)
+            if assignment_match:
+                written_variable = assignment_match.group(1)
+                usage = variable_usage_index.setdefault(written_variable, {"Reads": set(), "Writes": set()})
+                usage["Writes"].add(dialogue_id)
+                # Plain assignments don't read their target, so skip it when collecting reads
+                if assignment_match.group(2) == "":
+                    statement = statement[assignment_match.end():]
+        for regex_match in VARIABLE_REFERENCE_REGEX.finditer(statement):
+            variable_name = "{}.{}".format(regex_match.group(1), regex_match.group(2))
+            if regex_match.group(1) not in variable_namespace_list:
+                continue
+            usage = variable_usage_index.setdefault(variable_name, {"Reads": set(), "Writes": set()})
+            usage["Reads"].add(dialogue_id)
+
+
+def translate_code_condition(code_condition, dialogue_id=None, is_instruction=False):
     """
     Tries to convert the articy:draft Java/C# code conditions into Python and returns the converted string.
 
@@ -60,7 +171,9 @@ def translate_code_condition(code_condition):
     && -> and
     ! -> not
 
+    If a dialogue_id is given, the referenced variables are recorded in the variable_usage_index.
     """
+    record_variable_usage(code_condition, dialogue_id, is_instruction)
     # Remove the variable set from the string that was set in global_var_prefix
     converted_text = code_condition.replace("{}.".format(config_global_var_prefix), "")
 
@@ -75,10 +188,64 @@ def translate_code_condition(code_condition):
         if regex_match:
             regex_index = regex_match.start()
             converted_text = converted_text[:regex_index] + "not " + converted_text[regex_index + 1:]
-    logging.debug("Converted Code: {} -> {}".format(code_condition, converted_text))
+    log_node_event("code", "Converted Code: %(Code)s -> %(Python)s", Code=code_condition, Python=converted_text)
     return converted_text
 
 
+def get_json_decoder(backend_name):
+    """
+    Takes the name of a JSON decoder backend and returns its name and loads function.
+    "auto" picks the first installed module of JSON_DECODER_BACKENDS.
+    If the requested backend is unknown or not installed, it falls back to the stdlib json module.
+    """
+    if backend_name == "auto":
+        backend_candidates = JSON_DECODER_BACKENDS
+    elif backend_name in JSON_DECODER_BACKENDS:
+        backend_candidates = [backend_name]
+    else:
+        logging.warning("Unknown JSON decoder %s, fall back to json!", backend_name)
+        return "json", json.loads
+    for backend_candidate in backend_candidates:
+        try:
+            backend_module = importlib.import_module(backend_candidate)
+        except ImportError:
+            continue
+        return backend_candidate, backend_module.loads
+    logging.warning("JSON decoder %s is not installed, fall back to json!", backend_name)
+    return "json", json.loads
+
+
+def load_json_file(file_path, backend_name, measure_memory=False):
+    """
+    Reads a JSON file, decodes it with the given backend and returns the data and the decode statistics.
+    The peak memory of the decoding is only measured on request, because tracing allocations slows it down.
+
+    (Backend, Bytes, Seconds, PeakMemory)
+    """
+    backend_name, backend_loads = get_json_decoder(backend_name)
+    with open(file_path, "rb") as file:
+        raw_data = file.read()
+    # articy:draft may write a UTF-8 BOM, which not every backend accepts
+    if raw_data.startswith(b"\xef\xbb\xbf"):
+        raw_data = raw_data[3:]
+
+    if measure_memory:
+        tracemalloc.start()
+    start_time = time.perf_counter()
+    json_data = backend_loads(raw_data)
+    decode_seconds = time.perf_counter() - start_time
+    peak_memory = None
+    if measure_memory:
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    decode_statistics = {"Backend": backend_name,
+                         "Bytes": len(raw_data),
+                         "Seconds": decode_seconds,
+                         "PeakMemory": peak_memory}
+    return json_data, decode_statistics
+
+
 def convert_entity(entity_data):
     """
     Reads and converts the data from an entity data set.
@@ -94,8 +261,8 @@ def convert_entity(entity_data):
     entity_element = {"Id": properties["Id"],
                       "ExternalId": entity_external_id}
 
-    logging.debug("Converted Entity: Id {} ({})".format(entity_element["Id"],
-                                                        entity_element["ExternalId"]))
+    log_node_event("entity", "Converted Entity: Id %(Id)s (%(ExternalId)s)",
+                   Id=entity_element["Id"], ExternalId=entity_element["ExternalId"])
     return entity_element
 
 
@@ -116,7 +283,7 @@ def convert_node(node_data):
 
     # Step 1: Read conditions and instructions on the input and output pins and converts them to python
     if properties["InputPins"][0]["Text"]:
-        condition = translate_code_condition(properties["InputPins"][0]["Text"])
+        condition = translate_code_condition(properties["InputPins"][0]["Text"], properties["Parent"])
     else:
         condition = ""
     # Jumps need an exception for the output pin because they do not have any output pins
@@ -124,7 +291,7 @@ def convert_node(node_data):
         instruction = ""
     else:
         if properties["OutputPins"][0]["Text"]:
-            instruction = translate_code_condition(properties["OutputPins"][0]["Text"])
+            instruction = translate_code_condition(properties["OutputPins"][0]["Text"], properties["Parent"], True)
         else:
             instruction = ""
     # returns all targeted node ids
@@ -138,9 +305,9 @@ def convert_node(node_data):
             if "Connections" not in output_element:
                 logging.error("- ERROR -")
                 logging.error("NODE HAS NO OUTGOING CONNECTIONS")
-                logging.error("Type:   {}".format(node_data["Type"]))
-                logging.error("ID:     {}".format(properties["Id"]))
-                logging.error("Parent: {}".format(properties["Parent"]))
+                logging.error("Type:   %s", node_data["Type"])
+                logging.error("ID:     %s", properties["Id"])
+                logging.error("Parent: %s", properties["Parent"])
             for connection in output_element["Connections"]:
                 target_list.append(connection["Target"])
 
@@ -157,17 +324,22 @@ def convert_node(node_data):
     # read and save the individual node fragments
     if node_data["Type"] == "DialogueFragment":
         node_element["Speaker"] = properties["Speaker"]
-        node_element["Text"] = properties["Text"].replace("\r\n", "\\n")
-        node_element["StageDirections"] = properties["StageDirections"]
+        node_element["Text"] = properties["Text"]
+        node_element["StageDirections"] = split_code_lines(properties["StageDirections"])
+        # Stage directions are Ren'Py code that may read and assign variables like an instruction
+        for stage_direction in node_element["StageDirections"]:
+            record_variable_usage(stage_direction.lstrip("$ "), properties["Parent"], True)
         node_element["MenuText"] = properties["MenuText"]
     elif node_data["Type"] == "Instruction":
         node_element["Expression"] = properties["Expression"]
+        record_variable_usage(properties["Expression"], properties["Parent"], True)
     elif node_data["Type"] == "Condition":
         node_element["Expression"] = properties["Expression"]
+        record_variable_usage(properties["Expression"], properties["Parent"], False)
     elif node_data["Type"] == "Hub":
         node_element["DisplayName"] = properties["DisplayName"]
 
-    logging.debug("Converted node data: Id {} ({})".format(node_element["Id"], node_element["Type"]))
+    log_node_event("node_data", "Converted node data: Id %(Id)s (%(Type)s)", Id=node_element["Id"], Type=node_element["Type"])
     return node_element
 
 
@@ -222,33 +394,250 @@ def get_label_name(node, dialogue_list):
             return label_name
 
 
+def read_language_texts(model_list):
+    """
+    Reads the texts of all DialogueFragments from the models of a language export.
+    Returns a dictionary with the converted Text and MenuText of each node by its Id.
+    """
+    language_texts = {}
+    for element in model_list:
+        if element["Type"] == "DialogueFragment":
+            properties = element["Properties"]
+            language_texts[properties["Id"]] = {"Text": convert_renpy_text(properties["Text"]),
+                                                "MenuText": convert_renpy_text(properties["MenuText"])}
+    return language_texts
+
+
+def append_text_line(line_list, text_slot_list, node, field, prefix, suffix, text_id=None):
+    """
+    Appends a line with the Text or MenuText of a node, converted for Ren'Py strings, to the line list.
+    The position, prefix and suffix of the text are stored in the text slot list,
+    so the texts of other languages can be put in place later without generating the dialogue again.
+    If a text_id is given, the line gets an id clause for Ren'Py translate blocks.
+    """
+    text_slot_list.append({"Position": len(line_list),
+                           "Id": node["Id"],
+                           "Field": field,
+                           "Prefix": prefix,
+                           "Suffix": suffix,
+                           "Text": convert_renpy_text(node[field])})
+    line = "{}{}{}".format(prefix, text_slot_list[-1]["Text"], suffix)
+    if text_id:
+        line = "{} id {}".format(line, text_id)
+    line_list.append(line)
+
+
+def get_language_text(text_slot, language_texts):
+    """
+    Returns the text of a text slot in the given language, falls back to the original text if it is missing
+    """
+    node_texts = language_texts.get(text_slot["Id"])
+    if node_texts is None:
+        logging.warning("Node %s is missing in the language export, keep its original text", text_slot["Id"])
+        return text_slot["Text"]
+    return node_texts[text_slot["Field"]]
+
+
+def get_jump_targets(code_lines):
+    """
+    Takes lines of generated Ren'Py code and returns the labels they jump to, in order and without duplicates
+    """
+    jump_targets = []
+    for code_line in code_lines:
+        code_parts = code_line.split()
+        if len(code_parts) == 2 and code_parts[0] == "jump" and code_parts[1] not in jump_targets:
+            jump_targets.append(code_parts[1])
+    return jump_targets
+
+
+def find_label_position(code_lines, label_name):
+    """
+    Returns the position of the line that defines the given label in the code lines or None if it is missing.
+    The line may have leading or trailing spaces and a comment, so labels that users edited are found as well.
+    """
+    label_regex = re.compile(r"^\s*label\s+{}\s*:".format(re.escape(label_name)))
+    for position, code_line in enumerate(code_lines):
+        if label_regex.match(code_line):
+            return position
+    return None
+
+
+def get_label_code(code_lines, label_position):
+    """
+    Returns the lines of the label that starts at the given position, up to the next unindented statement
+    """
+    label_code = []
+    for code_line in code_lines[label_position + 1:]:
+        if code_line.strip().startswith("label ") or \
+                (code_line.strip() and not code_line[0].isspace() and not code_line.startswith("#")):
+            break
+        label_code.append(code_line)
+    return label_code
+
+
+def get_playtest_hit_line(hit_key):
+    """
+    Returns the Ren'Py line that counts a playtest hit for the given label or choice key
+    """
+    return "$ articy_playtest_hit(\"{}\")".format(hit_key)
+
+
+def convert_playtest_label(label_name, dialogue_list, dialogue_node_list):
+    """
+    Takes a generated label name and returns the articy data that belongs to it.
+    Node labels are named "[DialogueName]_[NodeId]", start and end labels map to their Dialogue.
+    Returns None for names that are not generated labels or whose node or Dialogue doesn't exist.
+
+    (Dialogue, Id, Type, Text)
+    """
+    if "_" not in label_name:
+        return None
+    dialogue_name, label_suffix = label_name.rsplit("_", 1)
+    label_element = {"Dialogue": dialogue_name, "Id": "", "Type": "", "Text": ""}
+    if label_suffix in ["start", "end"]:
+        for dialogue in dialogue_list:
+            if dialogue["DisplayName"] == dialogue_name:
+                label_element["Id"] = dialogue["Id"]
+                label_element["Type"] = dialogue["Type"]
+                return label_element
+        return None
+
+    node = get_node_by_id(label_suffix, dialogue_node_list)
+    if not node:
+        return None
+    label_element["Id"] = label_suffix
+    label_element["Type"] = node["Type"]
+    if node["Type"] == "DialogueFragment":
+        label_element["Text"] = node["Text"]
+    elif node["Type"] == "Hub":
+        label_element["Text"] = node["DisplayName"]
+    return label_element
+
+
+def write_playtest_report(hits_file_path, report_file_path, dialogue_list, dialogue_node_list):
+    """
+    Reads a playtest hits file and writes the hit counts merged with their articy node ids and dialogue names
+    as CSV file, sorted by hits so the hot paths are on top.
+    Choice keys are stored as "[MenuLabel]>[ChoiceLabel]" and report the choice node.
+    """
+    with open(hits_file_path) as hits_file:
+        hits = json.load(hits_file)
+
+    report_list = []
+    for hit_key, hit_count in hits.items():
+        if ">" in hit_key:
+            choice_label = hit_key.split(">", 1)[1]
+            report_element = convert_playtest_label(choice_label, dialogue_list, dialogue_node_list)
+            if report_element is None:
+                logging.warning("Unknown playtest hit key %s, skip", hit_key)
+                continue
+            report_element["Kind"] = "Choice"
+            node = get_node_by_id(report_element["Id"], dialogue_node_list)
+            if node and node["Type"] == "DialogueFragment":
+                report_element["Text"] = node["MenuText"]
+        else:
+            report_element = convert_playtest_label(hit_key, dialogue_list, dialogue_node_list)
+            if report_element is None:
+                logging.warning("Unknown playtest hit key %s, skip", hit_key)
+                continue
+            report_element["Kind"] = "Label"
+        report_element["Key"] = hit_key
+        report_element["Hits"] = hit_count
+        report_list.append(report_element)
+    report_list.sort(key=lambda x: (-x["Hits"], x["Key"]))
+
+    with open(report_file_path, "w", newline="") as report_file:
+        report_writer = csv.DictWriter(report_file, ["Hits", "Kind", "Dialogue", "Id", "Type", "Key", "Text"])
+        report_writer.writeheader()
+        report_writer.writerows(report_list)
+
+    logging.info("Wrote %s playtest entries to %s", len(report_list), report_file_path)
+    for report_element in report_list[:10]:
+        logging.info("%8s %s %s (%s)", report_element["Hits"], report_element["Kind"],
+                     report_element["Key"], report_element["Type"])
+
+
 if __name__ == "__main__":
-    ########################################################################################################################
-    logging.info("Step 1: Read Configuration File")
+    argument_parser = argparse.ArgumentParser(description="Converts an articy:draft JSON export to Ren'Py scripts.")
+    argument_parser.add_argument("--playtest-report", metavar="HITS_FILE",
+                                 help="Merge a playtest hits file onto the articy data instead of converting")
+    argument_parser.add_argument("--json-decoder", choices=["auto"] + JSON_DECODER_BACKENDS,
+                                 help="JSON decoder backend, overrides json_decoder of the config file")
+    argument_parser.add_argument("--json-decoder-memory", action="store_true",
+                                 help="Measure the peak memory of the JSON decoding")
+    argument_parser.add_argument("--verbosity", choices=list(VERBOSITY_LEVELS),
+                                 help="Amount of logging, overrides verbosity of the config file")
+    argument_parser.add_argument("--diagnostics-file", metavar="FILE",
+                                 help="Write the per node diagnostics as JSON records to this file")
+    arguments = argument_parser.parse_args()
 
     config = configparser.ConfigParser()
     config.read('config.ini')
 
+    config_verbosity = config['DEFAULT'].get('verbosity', 'normal')
+    config_diagnostics_file = config['DEFAULT'].get('diagnostics_file', '')
+    if arguments.verbosity:
+        config_verbosity = arguments.verbosity
+    if arguments.diagnostics_file:
+        config_diagnostics_file = arguments.diagnostics_file
+    logging.basicConfig(level=VERBOSITY_LEVELS.get(config_verbosity, logging.INFO))
+    if config_verbosity not in VERBOSITY_LEVELS:
+        logging.warning("Unknown verbosity %s, fall back to normal!", config_verbosity)
+    if config_diagnostics_file:
+        diagnostics_file = open(config_diagnostics_file, "w")
+    node_diagnostics_enabled = config_verbosity == "verbose" or diagnostics_file is not None
+
+    ########################################################################################################################
+    logging.info("Step 1: Read Configuration File")
+
     config_json_file = config['DEFAULT']['json_file']
     config_export_path = config['DEFAULT']['export_path']
     config_file_name_prefix = config['DEFAULT']['file_name_prefix']
     config_global_var_prefix = config['DEFAULT']['global_var_prefix']
     config_entity_features = config['DEFAULT']['entity_features'].split(";")
-    config_menu_captions = config['DEFAULT']['menu_captions']
-
-    if config_menu_captions.lower() in ['true', 'yes', 't', 'y', '1']:
-        config_menu_captions = True
-    elif config_menu_captions.lower() in ['false', 'no', 'f', 'n', '0']:
-        config_menu_captions = False
-    else:
-        # Fail state, just make it false
-        config_menu_captions = False
+    # Fail state for unreadable values, just make it false
+    config_menu_captions = read_config_bool(config['DEFAULT'], 'menu_captions')
+    config_prune_unused_variables = read_config_bool(config['DEFAULT'], 'prune_unused_variables')
+    config_playtest_instrumentation = read_config_bool(config['DEFAULT'], 'playtest_instrumentation')
+    config_playtest_batch_size = int(config['DEFAULT'].get('playtest_batch_size', '50'))
+    config_languages = []
+    for language_entry in config['DEFAULT'].get('languages', '').split(";"):
+        if language_entry.strip():
+            language_name, separator, language_json_file = language_entry.partition("=")
+            language_name = language_name.strip()
+            language_json_file = language_json_file.strip()
+            if not separator or not language_name or not language_json_file:
+                logging.error("Language entry %s has to be written as [Language]=[JSON file]!", language_entry.strip())
+                sys.exit(1)
+            if not os.path.isfile(language_json_file):
+                logging.error("JSON file %s of language %s doesn't exist!", language_json_file, language_name)
+                sys.exit(1)
+            config_languages.append((language_name, language_json_file))
+    config_language_mode = config['DEFAULT'].get('language_mode', 'translate')
+    config_language_export_path = config['DEFAULT'].get('language_export_path', '')
+    if config_languages and config_language_mode not in ["translate", "tree"]:
+        logging.error("Unknown language_mode %s, it has to be translate or tree!", config_language_mode)
+        sys.exit(1)
+    if config_languages and config_language_mode == "tree" and not config_language_export_path:
+        logging.error("language_mode tree needs a language_export_path for the language trees!")
+        sys.exit(1)
+    # Dialogue texts get an id for the translate blocks, so Ren'Py finds their translations
+    config_text_ids = bool(config_languages) and config_language_mode == "translate"
+    config_json_decoder = config['DEFAULT'].get('json_decoder', 'auto')
+    config_json_decoder_memory = read_config_bool(config['DEFAULT'], 'json_decoder_memory')
+    if arguments.json_decoder:
+        config_json_decoder = arguments.json_decoder
+    if arguments.json_decoder_memory:
+        config_json_decoder_memory = True
 
     ########################################################################################################################
     logging.info("Step 2: Read JSON File")
 
-    with open(config_json_file) as file:
-        articy_data = json.load(file)
+    articy_data, decode_statistics = load_json_file(config_json_file, config_json_decoder, config_json_decoder_memory)
+    logging.info("Decoded %s bytes with %s in %.3f seconds", decode_statistics["Bytes"],
+                 decode_statistics["Backend"], decode_statistics["Seconds"])
+    if decode_statistics["PeakMemory"] is not None:
+        logging.info("Peak memory of the decoding: %.1f MiB", decode_statistics["PeakMemory"] / 1048576)
 
     # Get only the Models data from the articy json data
     package_model_list = articy_data["Packages"][0]["Models"]
@@ -257,6 +646,14 @@ if __name__ == "__main__":
     ########################################################################################################################
     logging.info("Step 3: Store and Parse JSON Data")
 
+    # Variables are stored first, so the node conversion can recognize their namespaces
+    for element in global_variable_list:
+        namespace = element["Namespace"]
+        variable_namespace_list.append(namespace)
+        for variable_element in element["Variables"]:
+            variable_list.append({"Name": "{}.{}".format(namespace, variable_element["Variable"]),
+                                  "Value": variable_element["Value"]})
+
     for element in package_model_list:
         if element["Type"] in DIALOGUE_NODE_TYPES:
             dialogue_node_list.append(convert_node(element))
@@ -266,18 +663,36 @@ if __name__ == "__main__":
             # store container Dialogue nodes
             dialogue_list.append(convert_dialogue(element))
 
-    for element in global_variable_list:
-        namespace = element["Namespace"]
-        for variable_element in element["Variables"]:
-            variable_list.append("{}.{} = {}".format(namespace,
-                                                     variable_element["Variable"],
-                                                     variable_element["Value"]))
-
-
-    logging.info("Stored {} nodes".format(len(dialogue_node_list)))
-    logging.info("Stored {} entities".format(len(entity_list)))
-    logging.info("Stored {} dialogues".format(len(dialogue_list)))
-    logging.info("Stored {} global variables".format(len(variable_list)))
+    logging.info("Stored %s nodes", len(dialogue_node_list))
+    logging.info("Stored %s entities", len(entity_list))
+    logging.info("Stored %s dialogues", len(dialogue_list))
+    logging.info("Stored %s global variables", len(variable_list))
+
+    if arguments.playtest_report:
+        logging.info("Create Playtest Report")
+        write_playtest_report(arguments.playtest_report,
+                              "{}/playtest_report.csv".format(config_export_path),
+                              dialogue_list,
+                              dialogue_node_list)
+        if diagnostics_file:
+            diagnostics_file.close()
+        sys.exit(0)
+
+    # Only the texts of the other languages are read, the graph analysis of the following steps is shared
+    language_text_dict = {}
+    for language_name, language_json_file in config_languages:
+        logging.info("Read texts of language %s", language_name)
+        language_data, decode_statistics = load_json_file(language_json_file, config_json_decoder,
+                                                          config_json_decoder_memory)
+        logging.info("Decoded %s bytes of language %s with %s in %.3f seconds", decode_statistics["Bytes"],
+                     language_name, decode_statistics["Backend"], decode_statistics["Seconds"])
+        if decode_statistics["PeakMemory"] is not None:
+            logging.info("Peak memory of the decoding: %.1f MiB", decode_statistics["PeakMemory"] / 1048576)
+        language_text_dict[language_name] = read_language_texts(language_data["Packages"][0]["Models"])
+    # Menu texts are translated with Ren'Py string translations, collected for all dialogues
+    language_string_dict = {}
+    for language_name in language_text_dict:
+        language_string_dict[language_name] = {}
 
     ########################################################################################################################
     logging.info("Step 4: Generate List of Ids that have to become labels")
@@ -297,41 +712,43 @@ if __name__ == "__main__":
         for target in node["Target"]:
             if target in node_id_cache:
                 if target not in label_id_list:
-                    logging.debug("Node targeted more then once: {}".format(target))
+                    log_node_event("label_id", "Node targeted more then once: %(Id)s", Id=target, Reason="Targeted more then once")
                     label_id_list.append(target)
             else:
                 node_id_cache.append(target)
         # Condition 2: is the node a hub?
         if node["Type"] == "Hub":
             if node["Id"] not in label_id_list:
-                logging.debug("Node is a Hub: {}".format(node["Id"]))
+                log_node_event("label_id", "Node is a Hub: %(Id)s", Id=node["Id"], Reason="Hub")
                 label_id_list.append(node["Id"])
         # Condition 3: is a node targeted by a jump?
         if node["Type"] == "Jump":
             if node["Target"][0] not in label_id_list:
-                logging.debug("Node is targeted by a Jump: {}".format(node["Target"][0]))
+                log_node_event("label_id", "Node is targeted by a Jump: %(Id)s", Id=node["Target"][0], Reason="Jump target")
                 label_id_list.append(node["Target"][0])
         # Condition 4: is a node targeted by a condition?
         if node["Type"] == "Condition":
             for target in node["Target"]:
                 if target not in label_id_list:
-                    logging.debug("Node is targeted by a Condition: {}".format(target))
+                    log_node_event("label_id", "Node is targeted by a Condition: %(Id)s", Id=target, Reason="Condition target")
                     label_id_list.append(target)
         # Condition 5: is a node targeting more then one node?
         if len(node["Target"]) > 1:
             for target in node["Target"]:
                 if target not in label_id_list:
-                    logging.debug("Node is target of a Menu Choice: {}".format(target))
+                    log_node_event("label_id", "Node is target of a Menu Choice: %(Id)s", Id=target, Reason="Menu choice")
                     label_id_list.append(target)
 
     for dialogue in dialogue_list:
         # Add missing start nodes to the label list so we can jump to them.
         if dialogue["StartNode"] not in label_id_list:
-            logging.debug("Add missing dialogue start node to label list ({})".format(dialogue["StartNode"]))
+            log_node_event("label_id", "Add missing dialogue start node to label list (%(Id)s)",
+                           Id=dialogue["StartNode"], Reason="Dialogue start")
             label_id_list.append(dialogue["StartNode"])
         if dialogue["EndNode"]:
             if dialogue["EndNode"] not in label_id_list:
-                logging.debug("Add missing node that is connected to a dialogue to label list ({})".format(dialogue["StartNode"]))
+                log_node_event("label_id", "Add missing node that is connected to a dialogue to label list (%(Id)s)",
+                               Id=dialogue["EndNode"], Reason="Dialogue end")
                 label_id_list.append(dialogue["EndNode"])
 
     ########################################################################################################################
@@ -339,6 +756,8 @@ if __name__ == "__main__":
 
     # List used to create end labels in a separate file
     end_label_list = []
+    # Dictionary with the articy id, dialogue, file, line and jumps of every generated label
+    label_index = {}
 
     for dialogue in dialogue_list:
         # Just some statistics for the header of the dialogue file
@@ -346,41 +765,46 @@ if __name__ == "__main__":
         statistics_dialogue_count = 0
         statistics_word_count = 0
 
-        logging.info("==== Generating Dialogue {}".format(dialogue["DisplayName"]))
-        logging.info("Create the start and end labels for Dialogue {}".format(dialogue["DisplayName"]))
-        export_data = ["label {}_start:".format(dialogue["DisplayName"]),
-                       "    jump {}_{}".format(dialogue["DisplayName"], dialogue["StartNode"]),
-                       ""]
+        logging.debug("==== Generating Dialogue %s", dialogue["DisplayName"])
+        # Name, articy id and export_data position of each label, to fill the label index after the export
+        dialogue_label_list = [("{}_start".format(dialogue["DisplayName"]), dialogue["Id"], 0)]
+        # Position and origin of every text in the export_data, to put in the texts of other languages
+        dialogue_text_slots = []
+        export_data = ["label {}_start:".format(dialogue["DisplayName"])]
+        if config_playtest_instrumentation:
+            export_data.append("    {}".format(get_playtest_hit_line("{}_start".format(dialogue["DisplayName"]))))
+        export_data.append("    jump {}_{}".format(dialogue["DisplayName"], dialogue["StartNode"]))
+        export_data.append("")
 
         if not dialogue["EndNode"]:
             end_label_list.append(dialogue["DisplayName"])
 
         # Comb the label id list for labels that have the dialogue as its parent
-        logging.info("Start building labels")
         for label_id in label_id_list:
             node = get_node_by_id(label_id, dialogue_node_list)
             if not node:
-                logging.info("Id of an Dialogue found - skipped")
+                log_node_event("skip", "Id of an Dialogue found - skipped (%(Id)s)", Id=label_id)
             else:
                 if node["Parent"] == dialogue["Id"]:
-                    logging.debug("Node of current dialogue found.")
-                    logging.info("== Create new label {}_{}:".format(dialogue["DisplayName"], node["Id"]))
+                    label_name = get_label_name(node, dialogue_list)
+                    log_node_event("label", "== Create new label %(Label)s:", Label=label_name, Id=node["Id"])
                     export_data.append("")
-                    export_data.append("label {}_{}:".format(dialogue["DisplayName"], node["Id"]))
+                    dialogue_label_list.append((label_name, node["Id"], len(export_data)))
+                    export_data.append("label {}:".format(label_name))
                     # Group linear nodes in one label together
-                    logging.info("Try to combine Nodes into one label")
                     label_data = []
+                    label_text_slots = []
+                    if config_playtest_instrumentation:
+                        label_data.append(get_playtest_hit_line(label_name))
                     combine_label = True
                     while combine_label:
                         dialogue_choice_caption = ""
+                        log_node_event("node", "%(Type)s detected (%(Id)s)", Type=node["Type"], Id=node["Id"], Label=label_name)
                         if node["Type"] == "DialogueFragment":
-                            logging.info("DialogueFragment detected")
                             statistics_node_count += 1
                             statistics_dialogue_count += 1
                             statistics_word_count += len(node["Text"].split())
-                            if node["StageDirections"] != "":
-                                label_data.append("{}".format(node["StageDirections"]))
-                            logging.debug("Get DialogueFragments speaker")
+                            label_data.extend(node["StageDirections"])
                             speaker_name = "narrator"
                             for entity in entity_list:
                                 if entity["Id"] == node["Speaker"]:
@@ -388,34 +812,31 @@ if __name__ == "__main__":
                                         speaker_name = entity["ExternalId"]
                                     else:
                                         speaker_name = entity["DisplayName"]
+                            if speaker_name.lower() != "narrator":
+                                say_prefix = "{} \"".format(speaker_name)
+                            else:
+                                say_prefix = "\""
+                            text_id = None
+                            if config_text_ids:
+                                text_id = "articy_{}".format(node["Id"])
                             if node["Text"] != "":
-                                logging.info("Check if the DialogueFragment is located before a choice")
                                 if len(node["Target"]) > 1:
                                     if config_menu_captions:
-                                        logging.info("DialogueFragment located before a choice ({}), add it as caption to the menu".format(len(node["Target"])))
-                                        if speaker_name.lower() != "narrator":
-                                            dialogue_choice_caption = "{} \"{}\"".format(speaker_name, node["Text"])
-                                        else:
-                                            dialogue_choice_caption = "\"{}\"".format(node["Text"])
+                                        log_node_event("caption", "DialogueFragment located before a choice (%(Choices)s), add it as caption to the menu",
+                                                       Id=node["Id"], Choices=len(node["Target"]))
+                                        dialogue_choice_caption = say_prefix
                                     else:
-                                        logging.info("Found but caption mode disabled.")
+                                        log_node_event("caption", "Found but caption mode disabled (%(Id)s)", Id=node["Id"])
                                 else:
-                                    logging.debug("Write dialogue line for {}".format(speaker_name))
-                                    if speaker_name.lower() != "narrator":
-                                        label_data.append("{} \"{}\"".format(speaker_name, node["Text"]))
-                                    else:
-                                        label_data.append("\"{}\"".format(node["Text"]))
+                                    append_text_line(label_data, label_text_slots, node, "Text", say_prefix, "\"", text_id)
                         elif node["Type"] == "Hub":
-                            logging.info("Hub detected")
                             statistics_node_count += 1
                             label_data.append("# HUB: {}".format(node["DisplayName"]))
                         elif node["Type"] == "Jump":
-                            logging.info("Jump detected")
                             statistics_node_count += 1
                             label_data.append("# JUMP NODE:")
                             # Jump will be created further down when converter realizes that the next node is a label
                         elif node["Type"] == "Condition":
-                            logging.info("Condition detected")
                             statistics_node_count += 1
                             code = translate_code_condition(node["Expression"])
                             label_data.append("if {}:".format(code))
@@ -427,19 +848,25 @@ if __name__ == "__main__":
                             combine_label = False
 
                         if node["Instruction"] != "":
-                            logging.info("Instruction Pin detected")
+                            log_node_event("instruction", "Instruction Pin detected (%(Id)s)", Id=node["Id"])
                             code = translate_code_condition(node["Instruction"])
                             label_data.append("$ {}".format(code))
 
                         if combine_label:
                             # Check if a Choice Menu exists
                             if len(node["Target"]) > 1:
-                                logging.info("RenPy Menu Choice detected with {} choices.".format(len(node["Target"])))
+                                log_node_event("menu", "RenPy Menu Choice detected with %(Choices)s choices (%(Id)s)",
+                                               Id=node["Id"], Choices=len(node["Target"]))
                                 combine_label = False
+                                if dialogue_choice_caption and text_id:
+                                    # Say statements inside a menu can't have an id, so the caption is shown
+                                    # in front of it without waiting, the same way Ren'Py shows menu captions
+                                    append_text_line(label_data, label_text_slots, node, "Text",
+                                                     dialogue_choice_caption, "\" nointeract", text_id)
                                 label_data.append("menu:")
-                                if dialogue_choice_caption:
-                                    logging.debug("Add cached DialogueFragment text to the menu")
-                                    label_data.append("    {}".format(dialogue_choice_caption))
+                                if dialogue_choice_caption and not text_id:
+                                    append_text_line(label_data, label_text_slots, node, "Text",
+                                                     "    {}".format(dialogue_choice_caption), "\"")
                                 # We first create a separate menu list so we can later sort them based on their Y position
                                 menu_list = []
                                 for target in node["Target"]:
@@ -450,28 +877,30 @@ if __name__ == "__main__":
                                     # jump_target_node = get_node_by_id(target, dialogue_node_list)
                                     statistics_word_count += len(jump_target_node["MenuText"].split())
                                     if jump_target_node["Condition"] != "":
-                                        logging.debug("Create Choice with if condition")
                                         code = translate_code_condition(jump_target_node["Condition"])
-                                        label_data.append("    \"{}\" if {}:".format(jump_target_node["MenuText"], code))
+                                        menu_suffix = "\" if {}:".format(code)
                                     else:
-                                        logging.debug("Create Choice")
-                                        label_data.append("    \"{}\":".format(jump_target_node["MenuText"]))
+                                        menu_suffix = "\":"
+                                    append_text_line(label_data, label_text_slots, jump_target_node, "MenuText",
+                                                     "    \"", menu_suffix)
                                     jump_label = get_label_name(jump_target_node, dialogue_list)
+                                    if config_playtest_instrumentation:
+                                        hit_key = "{}>{}".format(label_name, jump_label)
+                                        label_data.append("        {}".format(get_playtest_hit_line(hit_key)))
                                     label_data.append("        jump {}".format(jump_label))
 
                             if node["Target"][0] in label_id_list:
-                                logging.info("Detected that next Node will be a label, create jump")
+                                log_node_event("jump", "Detected that next Node will be a label, create jump (%(Target)s)",
+                                               Id=node["Id"], Target=node["Target"][0])
                                 combine_label = False
 
                                 target_dialogue = None
                                 for dial in dialogue_list:
                                     if dial["Id"] == node["Target"][0]:
-                                        logging.info("Target of the jump is a Dialogue!")
                                         target_dialogue = dial
 
                                 if target_dialogue:
                                     if node["Target"][0] == dialogue["Id"]:
-                                        logging.debug("Getting the name of the dialogue")
                                         if dialogue["EndNode"]:
                                             # We check if the target is a Dialogue or a normal Node:
                                             end_is_dialogue = False
@@ -484,6 +913,9 @@ if __name__ == "__main__":
                                                 jump_node = get_label_name(target_node, dialogue_list)
                                                 label_data.append("jump {}".format(jump_node))
                                         else:
+                                            if config_playtest_instrumentation:
+                                                end_label_name = "{}_end".format(dialogue["DisplayName"])
+                                                label_data.append(get_playtest_hit_line(end_label_name))
                                             label_data.append("jump {}_end".format(dialogue["DisplayName"]))
                                     else:
                                         label_data.append("jump {}_start".format(target_dialogue["DisplayName"]))
@@ -492,19 +924,24 @@ if __name__ == "__main__":
                                     jump_label = get_label_name(jump_target_node, dialogue_list)
                                     label_data.append("jump {}".format(jump_label))
                             elif node["Target"][0] == dialogue["Id"]:
-                                logging.info("Node targets parent Dialogue, jump to End block")
+                                log_node_event("end", "Node targets parent Dialogue, jump to End block (%(Id)s)", Id=node["Id"])
                                 combine_label = False
+                                if config_playtest_instrumentation:
+                                    end_label_name = "{}_end".format(dialogue["DisplayName"])
+                                    label_data.append(get_playtest_hit_line(end_label_name))
                                 label_data.append("jump {}_end".format(dialogue["DisplayName"]))
                             else:
-                                logging.debug("Get next node")
                                 node = get_node_by_id(node["Target"][0], dialogue_node_list)
 
-                    logging.info("Combining label finished")
                     # Append the generated lines to the export data list
+                    for text_slot in label_text_slots:
+                        text_slot["Position"] += len(export_data)
+                        text_slot["Prefix"] = "    {}".format(text_slot["Prefix"])
+                        dialogue_text_slots.append(text_slot)
                     for label_line in label_data:
                         export_data.append("    {}".format(label_line))
 
-        logging.info("Create dialogue file for {}".format(dialogue["DisplayName"]))
+        logging.debug("Create dialogue file for %s", dialogue["DisplayName"])
         export_header = ["###############################################################################",
                          "# {} {}".format(dialogue["Type"], dialogue["DisplayName"]),
                          "# Exported from articy:draft 3",
@@ -529,6 +966,54 @@ if __name__ == "__main__":
             for line in export_data:
                 dialogue_file.write("{}\n".format(line))
 
+        for language_name, language_texts in language_text_dict.items():
+            if config_language_mode == "tree":
+                # Same lines in the same place, only the texts are swapped
+                language_data = list(export_data)
+                for text_slot in dialogue_text_slots:
+                    language_data[text_slot["Position"]] = "{}{}{}".format(text_slot["Prefix"],
+                                                                           get_language_text(text_slot, language_texts),
+                                                                           text_slot["Suffix"])
+                language_path = os.path.join(config_language_export_path, language_name)
+                os.makedirs(language_path, exist_ok=True)
+                with open(os.path.join(language_path, file_name), "w", encoding="utf-8") as dialogue_file:
+                    for line in export_header:
+                        dialogue_file.write("{}\n".format(line))
+                    for line in language_data:
+                        dialogue_file.write("{}\n".format(line))
+            else:
+                translate_data = []
+                for text_slot in dialogue_text_slots:
+                    language_text = get_language_text(text_slot, language_texts)
+                    if text_slot["Field"] == "MenuText":
+                        if text_slot["Text"]:
+                            language_string_dict[language_name][text_slot["Text"]] = language_text
+                    else:
+                        translate_data.append("translate {} articy_{}:".format(language_name, text_slot["Id"]))
+                        translate_data.append("    {}{}{}".format(text_slot["Prefix"].lstrip(),
+                                                                  language_text,
+                                                                  text_slot["Suffix"]))
+                        translate_data.append("")
+                language_path = os.path.join(config_export_path, "tl", language_name)
+                os.makedirs(language_path, exist_ok=True)
+                with open(os.path.join(language_path, file_name), "w", encoding="utf-8") as translate_file:
+                    translate_file.write("# {} {} translated to {}\n\n".format(dialogue["Type"],
+                                                                                dialogue["DisplayName"],
+                                                                                language_name))
+                    for line in translate_data:
+                        translate_file.write("{}\n".format(line))
+
+        for label_number, (label_name, label_id, label_position) in enumerate(dialogue_label_list):
+            if label_number + 1 < len(dialogue_label_list):
+                label_code = export_data[label_position:dialogue_label_list[label_number + 1][2]]
+            else:
+                label_code = export_data[label_position:]
+            label_index[label_name] = {"Id": label_id,
+                                       "Dialogue": dialogue["DisplayName"],
+                                       "File": file_name,
+                                       "Line": len(export_header) + label_position + 1,
+                                       "Jumps": get_jump_targets(label_code)}
+
     ########################################################################################################################
     logging.info("Step 6: Create File with End Labels")
 
@@ -536,11 +1021,12 @@ if __name__ == "__main__":
 
     file_path = "{}/end_labels.rpy".format(config_export_path)
     if os.path.isfile(file_path):
+        with open(file_path) as file:
+            file_export = file.read().splitlines()
         for end_label in end_label_list:
-            with open(file_path) as file:
-                if "label {}_end:".format(end_label) in file.read():
-                    logging.info("End label {} already in file, skip".format(end_label))
-                    skip_labels.append(end_label)
+            if find_label_position(file_export, "{}_end".format(end_label)) is not None:
+                logging.debug("End label %s already in file, skip", end_label)
+                skip_labels.append(end_label)
     else:
         logging.info("No end labels file found, create it.")
         file_export = ["###############################################################################",
@@ -553,12 +1039,26 @@ if __name__ == "__main__":
 
     append_data = []
     for end_label in end_label_list:
-        if end_label not in skip_labels:
+        if end_label in skip_labels:
+            # Users may have edited existing end labels, so their jumps are read from the file
+            end_label_position = find_label_position(file_export, "{}_end".format(end_label))
+            end_label_line = end_label_position + 1
+            end_label_jumps = get_jump_targets(get_label_code(file_export, end_label_position))
+        else:
+            end_label_jumps = []
             append_data.append("")
+            end_label_line = len(file_export) + len(append_data) + 1
             append_data.append("label {}_end:".format(end_label))
             append_data.append("    # Exported {}".format(datetime.datetime.today().strftime('%Y-%m-%d - %H:%M:%S')))
             append_data.append("    return")
             append_data.append("")
+        for dialogue in dialogue_list:
+            if dialogue["DisplayName"] == end_label:
+                label_index["{}_end".format(end_label)] = {"Id": dialogue["Id"],
+                                                           "Dialogue": end_label,
+                                                           "File": "end_labels.rpy",
+                                                           "Line": end_label_line,
+                                                           "Jumps": end_label_jumps}
 
     with open(file_path, "a+") as variables_file:
         for line in append_data:
@@ -566,6 +1066,37 @@ if __name__ == "__main__":
 
     ########################################################################################################################
     logging.info("Step 7: Create global variable definition file")
+
+    # Build the usage report with dialogue names, so tools don't have to know the articy ids
+    dialogue_name_dict = {}
+    for dialogue in dialogue_list:
+        dialogue_name_dict[dialogue["Id"]] = dialogue["DisplayName"]
+    usage_report = {"Variables": {}, "Dialogues": {}, "Unused": []}
+    for variable in variable_list:
+        usage = variable_usage_index.get(variable["Name"], {"Reads": set(), "Writes": set()})
+        usage_report["Variables"][variable["Name"]] = {
+            "Reads": sorted(dialogue_name_dict.get(dialogue_id, dialogue_id) for dialogue_id in usage["Reads"]),
+            "Writes": sorted(dialogue_name_dict.get(dialogue_id, dialogue_id) for dialogue_id in usage["Writes"])}
+        if not usage["Reads"] and not usage["Writes"]:
+            usage_report["Unused"].append(variable["Name"])
+        for access in ["Reads", "Writes"]:
+            for dialogue_id in usage[access]:
+                dialogue_name = dialogue_name_dict.get(dialogue_id, dialogue_id)
+                dialogue_usage = usage_report["Dialogues"].setdefault(dialogue_name, {"Reads": [], "Writes": []})
+                dialogue_usage[access].append(variable["Name"])
+    for dialogue_usage in usage_report["Dialogues"].values():
+        dialogue_usage["Reads"].sort()
+        dialogue_usage["Writes"].sort()
+    logging.info("%s of %s global variables are not referenced by any dialogue", len(usage_report["Unused"]),
+                 len(variable_list))
+    with open("{}/variable_usage.json".format(config_export_path), "w") as usage_file:
+        json.dump(usage_report, usage_file, indent=2, sort_keys=True)
+
+    if config_prune_unused_variables:
+        logging.info("Leave unreferenced variables out of the variable definition file")
+        unused_variable_set = set(usage_report["Unused"])
+        variable_list = [variable for variable in variable_list if variable["Name"] not in unused_variable_set]
+
     export_header = ["###############################################################################",
                      "# Global Game Variables", "# Exported from articy:draft 3",
                      "# Exported {}".format(datetime.datetime.today().strftime('%Y-%m-%d - %H:%M:%S')),
@@ -575,6 +1106,43 @@ if __name__ == "__main__":
         for line in export_header:
             variables_file.write("{}\n".format(line))
         variables_file.write("label init_articy_vars:\n")
-        for line in variable_list:
-            variables_file.write("   $ {}\n".format(line))
+        for variable in variable_list:
+            variables_file.write("   $ {} = {}\n".format(variable["Name"], variable["Value"]))
         variables_file.write("   return\n")
+
+    ########################################################################################################################
+    logging.info("Step 8: Create label index file")
+
+    # Reverse lookup from articy ids to labels, Dialogues point to their start label
+    node_label_dict = {}
+    for label_name, label_element in label_index.items():
+        if label_element["Id"] not in node_label_dict or label_name.endswith("_start"):
+            node_label_dict[label_element["Id"]] = label_name
+    with open("{}/label_index.json".format(config_export_path), "w") as index_file:
+        json.dump({"Labels": label_index, "Nodes": node_label_dict}, index_file, separators=(",", ":"), sort_keys=True)
+
+    if config_playtest_instrumentation:
+        ####################################################################################################################
+        logging.info("Step 9: Create playtest hit counter file")
+        with open("{}/articy_playtest.rpy".format(config_export_path), "w") as playtest_file:
+            playtest_file.write(PLAYTEST_RUNTIME_CODE.format(batch_size=config_playtest_batch_size))
+
+    if language_text_dict:
+        ####################################################################################################################
+        logging.info("Step 10: Complete language exports")
+        for language_name in language_text_dict:
+            if config_language_mode == "tree":
+                # The other files don't contain any texts, so the language trees get copies of them
+                for file_name in ["end_labels.rpy", "game_variables.rpy", "articy_playtest.rpy"]:
+                    file_path = os.path.join(config_export_path, file_name)
+                    if os.path.isfile(file_path):
+                        shutil.copy(file_path, os.path.join(config_language_export_path, language_name, file_name))
+            else:
+                with open(os.path.join(config_export_path, "tl", language_name, "articy_strings.rpy"), "w",
+                          encoding="utf-8") as strings_file:
+                    strings_file.write("translate {} strings:\n".format(language_name))
+                    for old_text, new_text in sorted(language_string_dict[language_name].items()):
+                        strings_file.write("\n    old \"{}\"\n    new \"{}\"\n".format(old_text, new_text))
+
+    if diagnostics_file:
+        diagnostics_file.close()
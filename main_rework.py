@@ -2,8 +2,11 @@ import configparser
 import logging
 import json
 
+from renpy_text import convert_renpy_text, split_code_lines
 
-logging.basicConfig(level=logging.DEBUG)
+
+# Log levels of the verbosity setting, "verbose" also logs every node
+VERBOSITY_LEVELS = {"quiet": logging.WARNING, "normal": logging.INFO, "verbose": logging.DEBUG}
 
 
 def filter_entries(model_list):
@@ -72,7 +75,7 @@ def get_label_ids(model_list):
     label_id_list = []
     for node in model_list:
         node_id = node['Properties']['Id']
-        logging.debug('Checking Node {}....'.format(node_id))
+        logging.debug('Checking Node %s....', node_id)
         # If node is targeted by Dialogue InputPins
         if node['Type'] == 'Dialogue' or node['Type'] == 'FlowFragment':
             for connection in node['Properties']['InputPins'][0]['Connections']:
@@ -101,13 +104,13 @@ def get_label_ids(model_list):
             if node['Properties']['Id'] in target_ids:
                 node_references += 1
         if node_references > 1:
-            logging.debug('....Node referenced more than once ({}), add its Id'.format(node_references))
+            logging.debug('....Node referenced more than once (%s), add its Id', node_references)
             label_id_list.append(node['Properties']['Id'])
 
         # If node is targeted by an node with with multiple output nodes
         node_targets = get_node_targets_id_by_node(node)
         if len(node_targets) > 1:
-            logging.debug('....Node targets more than one node ({}), add its targets Ids'.format(node_references))
+            logging.debug('....Node targets more than one node (%s), add its targets Ids', len(node_targets))
             label_id_list.extend(node_targets)
     label_id_list = list(set(label_id_list))
     return label_id_list
@@ -146,8 +149,8 @@ def convert_dialogue_fragment(node, entity_nodes):
     Converts a DialogueFragment node into RenPy code.
     """
     code_list = []
-    dialogue_text = node['Properties']['Text'].replace('\r\n', '\\n')
-    dialogue_stage_directions = node['Properties']['StageDirections']
+    dialogue_text = convert_renpy_text(node['Properties']['Text'])
+    dialogue_stage_directions = split_code_lines(node['Properties']['StageDirections'])
     speaker_id = node['Properties']['Speaker']
     character = 'narrator'
     for node in entity_nodes:
@@ -157,8 +160,8 @@ def convert_dialogue_fragment(node, entity_nodes):
             else:
                 character = node['Properties']['DisplayName'].replace(" ", "_").lower()
 
-    if dialogue_stage_directions:
-        code_list.append('    {}'.format(dialogue_stage_directions))
+    for stage_direction in dialogue_stage_directions:
+        code_list.append('    {}'.format(stage_direction))
     # ToDo: speaker_id convert to true name
     if character == 'narrator':
         if dialogue_text:
@@ -287,7 +290,7 @@ def generate_menu(target_ids, model_list):
         node_id = node['Properties']['Id']
         menu_condition = node['Properties']['InputPins'][0]['Text']
         parent_name = get_parent_name_by_parent_id(node['Properties']['Parent'], model_list)
-        menu_text = node['Properties']['MenuText']
+        menu_text = convert_renpy_text(node['Properties']['MenuText'])
         if menu_condition:
             menu_list.append('        \"{}\" if {}:'.format(menu_text, menu_condition))
         else:
@@ -298,10 +301,13 @@ def generate_menu(target_ids, model_list):
 
 
 if __name__ == '__main__':
-    logging.info("######################################")
-    logging.info("STEP 1: Read Config")
     config = configparser.ConfigParser()
     config.read('config.ini')
+    config_verbosity = config['DEFAULT'].get('verbosity', 'normal')
+    logging.basicConfig(level=VERBOSITY_LEVELS.get(config_verbosity, logging.INFO))
+
+    logging.info("######################################")
+    logging.info("STEP 1: Read Config")
     config_json_file = config['DEFAULT']['json_file']
     config_export_path = config['DEFAULT']['export_path']
     config_entities = config['DEFAULT']['entity_types'].split(";")
@@ -0,0 +1,60 @@
+"""
+Text conversion for the strings the converters write into Ren'Py scripts.
+"""
+import functools
+import re
+
+# Replacements for single characters that would break a quoted Ren'Py string or start a substitution/text tag
+RENPY_TEXT_REPLACEMENTS = {"\r\n": "\\n",
+                           "\r": "\\n",
+                           "\n": "\\n",
+                           "\\": "\\\\",
+                           "\"": "\\\"",
+                           "[": "[[",
+                           "{": "{{"}
+
+# articy:draft formatting tags and the Ren'Py text tags they become
+RENPY_TEXT_TAGS = {"b": "b",
+                   "i": "i",
+                   "u": "u",
+                   "s": "s",
+                   "color": "color",
+                   "size": "size"}
+
+# One regex for all replacements, so every text is converted in a single pass
+RENPY_TEXT_REGEX = re.compile(r"\r\n|[\r\n\\\"\[{]|<(/?)(b|i|u|s|color|size)(?:=[\"']?([^\"'<>]*)[\"']?)?>",
+                              re.IGNORECASE)
+
+
+def convert_text_match(regex_match):
+    """
+    Returns the replacement for a single match of the RENPY_TEXT_REGEX
+    """
+    if regex_match.group(2) is None:
+        return RENPY_TEXT_REPLACEMENTS[regex_match.group(0)]
+    tag_name = RENPY_TEXT_TAGS[regex_match.group(2).lower()]
+    if regex_match.group(1):
+        return "{{/{}}}".format(tag_name)
+    if regex_match.group(3) is not None:
+        return "{{{}={}}}".format(tag_name, regex_match.group(3))
+    return "{{{}}}".format(tag_name)
+
+
+@functools.lru_cache(maxsize=None)
+def convert_renpy_text(text):
+    """
+    Converts an articy:draft text into the content of a quoted Ren'Py string and returns it.
+
+    Quotes and backslashes are escaped, "[" and "{" are doubled so Ren'Py shows them as text,
+    newlines become "\\n" and the formatting tags <b>, <i>, <u>, <s>, <color=...> and <size=...>
+    become the matching Ren'Py text tags.
+    Texts repeat a lot in dialogues, so the results are cached.
+    """
+    return RENPY_TEXT_REGEX.sub(convert_text_match, text)
+
+
+def split_code_lines(code):
+    """
+    Splits a block of Ren'Py code like stage directions into its non-empty lines and returns them as list
+    """
+    return [code_line.rstrip() for code_line in code.splitlines() if code_line.strip()]